@@ -1,8 +1,19 @@
 import re
-import xml.etree.ElementTree as ET
-from functools import cache
-from math import atan2, degrees, dist
-from urllib.request import Request, urlopen
+from functools import lru_cache
+from http.client import BadStatusLine, HTTPSConnection
+from math import atan2, hypot
+
+import numpy as np
+
+try:
+    from lxml import etree as ET  # libxml2-backed, noticeably faster
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 try:
     import krita
@@ -23,42 +34,68 @@ VERSION = "0.1.4"
 
 
 def generate_base36():
-    """Hacky base 36 encoder/decoder generator, works only below 36**2"""
+    """Hacky base 36 encoder generator, works only below 36**2"""
 
     def digit(digit):
         if digit < 10:
             return str(digit)
         return chr(digit + 87)
 
-    single_digits = [(i, digit(i)) for i in range(36)]
-    encoder = [None] * 36 * 36
-    decoder = {}
-    for i, first in single_digits:
-        wholes = 36 * i
-        for j, second in single_digits:
-            b36 = first + second
-            encoder[wholes + j] = b36
-            decoder[b36] = wholes + j
-    return encoder, decoder
+    single_digits = [digit(i) for i in range(36)]
+    return [first + second for first in single_digits for second in single_digits]
+
 
+ENCODER = generate_base36()
+ENCODER_ARR = np.array(ENCODER, dtype="S2")
+# maps the ASCII code of each base36 digit to its 0-35 value
+B36_TRANS = bytes(
+    code - 48 if 48 <= code <= 57 else code - 87 if 97 <= code <= 122 else 0
+    for code in range(256)
+)
 
-ENCODER, DECODER = generate_base36()
+
+def decode_line(base36_line):
+    """Decodes one base36 line into an (N, 2) array of point coordinates."""
+
+    digits = np.frombuffer(
+        base36_line.encode("ascii").translate(B36_TRANS), dtype=np.uint8
+    )
+    # ignore trailing leftovers shorter than one 4-digit point
+    digits = digits[: digits.size & ~3]
+    return (digits[::2].astype(np.int16) * 36 + digits[1::2]).reshape(-1, 2)
+
+
+def encode_points(points):
+    """Encodes an (N, 2) integer coordinate array into one base36 line (bytes)."""
+
+    return ENCODER_ARR[points.ravel()].tobytes()
+
+
+# dialog singletons, built lazily so plugin load time stays unchanged
+error_dialog = None
+message_box = None
 
 
 def show_error(message):
     """Helper function to show an error to user."""
 
-    error = QErrorMessage()
-    error.setWindowTitle(NAME)
-    error.showMessage(message)
-    error.exec()
+    global error_dialog  # pylint: disable=global-statement
+
+    if error_dialog is None:
+        error_dialog = QErrorMessage()
+        error_dialog.setWindowTitle(NAME)
+    error_dialog.showMessage(message)
+    error_dialog.exec()
 
 
 def show_message(message):
     """Helper function to show a message to user."""
 
-    message_box = QMessageBox()
-    message_box.setWindowTitle(NAME)
+    global message_box  # pylint: disable=global-statement
+
+    if message_box is None:
+        message_box = QMessageBox()
+        message_box.setWindowTitle(NAME)
     message_box.setText(message)
     message_box.exec()
 
@@ -92,34 +129,36 @@ def get_document():
     return document
 
 
-SPLITTER_P = re.compile(r"[a-z\d]{4}")
-FILTER_P = re.compile(r"[^a-z\d ]")
+# deletes every legal sketch-data character; anything left over is invalid
+NON_SKETCH_TRANS = str.maketrans("", "", "0123456789abcdefghijklmnopqrstuvwxyz ")
+PATH_PREFIX = (
+    '<path fill="none" stroke="#000000" stroke-width="3"'
+    ' stroke-linejoin="round" d="M'
+)
 
 
-@cache
+@lru_cache(maxsize=32)
 def data_to_svg(data):
-    svg = "<svg>"
+    parts = ["<svg>"]
     for base36_line in data.split():
-        pairs = SPLITTER_P.findall(base36_line)
-        for i, pos in enumerate(pairs):
-            pairs[i] = f"{DECODER[pos[0:2]]} {DECODER[pos[2:4]]}"
-        svg += f"""<path fill="none"
-        stroke="#000000"
-        stroke-width="3"
-        stroke-linejoin="round"
-        d="M{"L".join(pairs)}" />"""
-    svg += "</svg>"
-    return svg
+        parts.append(PATH_PREFIX)
+        parts.append("L".join(map(" ".join, decode_line(base36_line).astype(str))))
+        parts.append('"/>')
+    parts.append("</svg>")
+    return "".join(parts)
+
 
+def data_to_layer(data, trusted=False):
+    """Imports sketch data as vector layer into document.
 
-def data_to_layer(data):
-    """Imports sketch data as vector layer into document."""
+    Validation is skipped for trusted data produced by this plugin itself.
+    """
 
     document = get_document()
     if document is None:
         return
 
-    if FILTER_P.search(data) is not None:
+    if not trusted and data.translate(NON_SKETCH_TRANS):
         show_error("Your clipboard has non-sketch data. Can't import it.")
         return
 
@@ -131,202 +170,455 @@ def data_to_layer(data):
 
 
 FLOAT_P = re.compile(r"[-+]?\d+\.?\d*(?:e[-+]?\d+)?")
-COMMAND_ARGC_P = {"M": 2, "L": 2, "V": 1, "H": 1, "Z": 0}
-COMMAND_ARGV_P = re.compile(
-    rf"({'|'.join(COMMAND_ARGC_P.keys())})|({FLOAT_P.pattern})", re.I | re.M
-)
-NAMESPACE_P = re.compile(r"{.+}(?P<tag>\w+)")
+COMMAND_ARGC = bytearray(256)
+for letter, count in {"M": 2, "L": 2, "V": 1, "H": 1, "Z": 0, "C": 6}.items():
+    COMMAND_ARGC[ord(letter)] = COMMAND_ARGC[ord(letter.lower())] = count
+COMMANDS = "MLHVZCmlhvzc"
+COMMAND_CHARS = frozenset(COMMANDS)
+NUMBER_CHARS = frozenset("0123456789.eE")
+
+# maximum deviation in pixels, invisible once points are rounded to the grid
+BEZIER_TOLERANCE = 0.75
+
+
+def flatten_cubic(p0, p1, p2, p3, out, tolerance=BEZIER_TOLERANCE):
+    """Recursively subdivides one cubic until flat, appending points to out."""
+
+    x0, y0 = p0
+    x1, y1 = p1
+    x2, y2 = p2
+    x3, y3 = p3
+    # the control polygon's deviation from the p0-p3 chord bounds the error
+    dx = x3 - x0
+    dy = y3 - y0
+    chord = hypot(dx, dy)
+    if chord == 0.0:
+        deviation = max(hypot(x1 - x0, y1 - y0), hypot(x2 - x0, y2 - y0))
+    else:
+        deviation = (
+            max(
+                abs((x1 - x0) * dy - (y1 - y0) * dx),
+                abs((x2 - x0) * dy - (y2 - y0) * dx),
+            )
+            / chord
+        )
+    if deviation <= tolerance:
+        out.append(p3)
+        return
+    # de casteljau split at t = 0.5 by midpoint averaging
+    ax, ay = (x0 + x1) / 2, (y0 + y1) / 2
+    bx, by = (x1 + x2) / 2, (y1 + y2) / 2
+    cx, cy = (x2 + x3) / 2, (y2 + y3) / 2
+    abx, aby = (ax + bx) / 2, (ay + by) / 2
+    bcx, bcy = (bx + cx) / 2, (by + cy) / 2
+    mid = ((abx + bcx) / 2, (aby + bcy) / 2)
+    flatten_cubic(p0, (ax, ay), (abx, aby), mid, out, tolerance)
+    flatten_cubic(mid, (bcx, bcy), (cx, cy), p3, out, tolerance)
+
+
+SHAPE_TAG_P = re.compile(r"<(path|rect|ellipse)\s[^>]*>")
+ATTRIBUTE_P = re.compile(r'([\w-]+)="([^"]*)"')
+
+
+def parse_path_args(args):
+    """Converts collected number tokens; a bad run drops the whole command."""
+
+    try:
+        return list(map(float, args))
+    except ValueError:
+        return []
+
+
+def tokenize_path(d, number_chars=NUMBER_CHARS, command_chars=COMMAND_CHARS):
+    """Hand-written linear scanner over a path "d" attribute.
+
+    Returns (command, args) pairs; much cheaper than driving a big
+    alternation regex over Krita's path-dense SVG output. The character
+    tables are bound as defaults so the loop reads them as fast locals.
+    """
+
+    tokens = []
+    command = ""
+    args = []
+    number = ""
+    for char in d:
+        if char in "+-":
+            # a sign starts a new number unless it belongs to an exponent
+            if number and number[-1] in "eE":
+                number += char
+                continue
+            if number:
+                args.append(number)
+            number = char
+            continue
+        if char == "." and ("." in number or "e" in number or "E" in number):
+            # SVG allows compact runs like "0.5.5"; a second dot starts a new number
+            args.append(number)
+            number = "."
+            continue
+        if char in number_chars:
+            number += char
+            continue
+        if number:
+            args.append(number)
+            number = ""
+        if char in command_chars:
+            if command:
+                tokens.append((command, parse_path_args(args)))
+            command = char
+            args = []
+        elif char.isalpha():
+            # unsupported command (S/Q/T/A...): flush what came before and
+            # discard its numbers instead of misattributing them
+            if command:
+                tokens.append((command, parse_path_args(args)))
+            command = ""
+            args = []
+    if number:
+        args.append(number)
+    if command:
+        tokens.append((command, parse_path_args(args)))
+    return tokens
+
+
+def compile_path(attributes, argc_table=COMMAND_ARGC):
+    """Compiles a path's "d" attribute into lines of absolute points."""
+
+    px, py = 0.0, 0.0
+    new_lines = []
+    line = []
+    for command, args in tokenize_path(attributes.get("d", "")):
+        if command in "Zz":
+            if line:
+                line.append(line[0])
+            continue
+        argc = argc_table[ord(command)]
+        if not args or len(args) % argc:
+            continue  # malformed or empty command, skip it whole
+        if command in "Mm":
+            if line:
+                new_lines.append(line)
+                line = []
+            if command == "M":
+                px, py = args[0], args[1]
+            else:
+                px, py = px + args[0], py + args[1]
+            # extra coordinate pairs after a moveto are implicit linetos
+            command = "L" if command == "M" else "l"
+            args = args[2:]
+        for i in range(0, len(args), argc):
+            if not line:
+                line.append((px, py))
+            if command in "Cc":
+                control = args[i : i + 6]
+                if command == "c":
+                    control = [
+                        value + (px if j % 2 == 0 else py)
+                        for j, value in enumerate(control)
+                    ]
+                flatten_cubic(
+                    (px, py),
+                    (control[0], control[1]),
+                    (control[2], control[3]),
+                    (control[4], control[5]),
+                    line,
+                )
+                px, py = control[4], control[5]
+                continue
+            if command == "L":
+                px, py = args[i], args[i + 1]
+            elif command == "l":
+                px, py = px + args[i], py + args[i + 1]
+            elif command == "H":
+                px = args[i]
+            elif command == "h":
+                px += args[i]
+            elif command == "V":
+                py = args[i]
+            elif command == "v":
+                py += args[i]
+            line.append((px, py))
+    if line:
+        new_lines.append(line)
+    return new_lines
+
+
+def compile_rect(attributes):
+    """Compiles a rect element into its closed outline."""
+
+    x = float(attributes.get("x", 0))
+    y = float(attributes.get("y", 0))
+    width = float(attributes.get("width", 0))
+    height = float(attributes.get("height", 0))
+    return [
+        np.array(
+            [
+                [x, y],
+                [x + width, y],
+                [x + width, y + height],
+                [x, y + height],
+                [x, y],
+            ]
+        )
+    ]
+
+
+def compile_ellipse(attributes):
+    """Compiles an ellipse element into a closed polygon, about 2 px per step."""
+
+    cx = float(attributes.get("cx", 0))
+    cy = float(attributes.get("cy", 0))
+    rx = float(attributes.get("rx", 0))
+    ry = float(attributes.get("ry", 0))
+    steps = max(16, int(np.pi * (rx + ry) / 2))
+    rad = np.linspace(0, 2 * np.pi, steps + 1)
+    return [np.stack([cx + rx * np.cos(rad), cy + ry * np.sin(rad)], axis=1)]
+
+
+COMPILE_MAP = {"path": compile_path, "rect": compile_rect, "ellipse": compile_ellipse}
+
+
+def compile_lines(tag, attributes):
+    """Compiles one shape element into float arrays with its transform applied."""
 
+    new_lines = [
+        np.asarray(line, dtype=np.float64)
+        for line in COMPILE_MAP[tag](attributes)
+        if len(line)
+    ]
 
-@cache
+    # in rare case of line start being at (0, 0) there's no transform attribute
+    if "transform" in attributes:
+        transform = attributes["transform"]
+        numbers = FLOAT_P.findall(transform)
+        numbers = list(map(float, numbers))
+
+        # krita does either translation or matrix
+        # no skews, rotations or others
+        if len(numbers) == 2:  # translation
+            translation = np.array(numbers)
+            new_lines = [line + translation for line in new_lines]
+        elif len(numbers) == 6:  # matrix
+            matrix = np.array([[numbers[0], numbers[2]], [numbers[1], numbers[3]]])
+            translation = np.array(numbers[4:6])
+            new_lines = [line @ matrix.T + translation for line in new_lines]
+
+    return new_lines
+
+
+@lru_cache(maxsize=32)
+def parse_paths(svg):
+    """Parses SVG once into per-path (N, 2) float arrays, transforms applied."""
+
+    path_lines = []
+    for tag_match in SHAPE_TAG_P.finditer(svg):
+        attributes = dict(ATTRIBUTE_P.findall(tag_match.group(0)))
+        path_lines += compile_lines(tag_match.group(1), attributes)
+
+    if not path_lines and "<path" in svg:
+        # not the flat markup krita emits, let a real XML parser deal with it;
+        # lxml refuses str input carrying an encoding declaration, so parse bytes
+        for obj in ET.fromstring(svg.encode()):
+            if not isinstance(obj.tag, str):
+                continue  # comments and processing instructions
+            tag = obj.tag.rpartition("}")[2]  # strip the xml namespace
+            if tag in COMPILE_MAP:
+                path_lines += compile_lines(tag, obj.attrib)
+
+    return path_lines
+
+
+# half a pixel on the 800x600 canvas, visually lossless
+RDP_EPSILON = 0.5
+MERGE_DISTANCE = 1
+
+
+def simplify_line(points, epsilon=RDP_EPSILON):
+    """Ramer-Douglas-Peucker simplification of one (N, 2) point array."""
+
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        offsets = points[start : end + 1] - points[start]
+        chord = points[end] - points[start]
+        chord_length = np.hypot(chord[0], chord[1])
+        if chord_length == 0:  # closed segment, use distance to the point
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:  # perpendicular distance to the chord
+            distances = (
+                np.abs(offsets[:, 0] * chord[1] - offsets[:, 1] * chord[0])
+                / chord_length
+            )
+        furthest = np.argmax(distances)
+        if distances[furthest] > epsilon:
+            keep[start + furthest] = True
+            stack += [(start, start + furthest), (start + furthest, end)]
+    return points[keep]
+
+
+def clip_lines(lines):
+    """Simplifies, rounds, clips and de-dupes lines into int16 point arrays."""
+
+    clipped = []
+    for line in lines:
+        line = simplify_line(line)
+        # throw out of bounds, merge, round, flatten
+        points = np.rint(line)
+        in_bounds = (
+            (points[:, 0] >= 0)
+            & (points[:, 0] <= 800)
+            & (points[:, 1] >= 0)
+            & (points[:, 1] <= 600)
+        )
+        # survivors fit in 10 bits, narrow only after the bounds check
+        points = points[in_bounds].astype(np.int16)
+        if len(points) == 0:
+            continue
+        # drop points closer than merge distance to their predecessor
+        keep = np.r_[
+            True,
+            (np.abs(np.diff(points, axis=0)) >= MERGE_DISTANCE).any(axis=1),
+        ]
+        clipped.append(points[keep])
+    return clipped
+
+
+@lru_cache(maxsize=32)
 def svg_to_data(svg):
     if len(svg) == 0:
         return svg
 
-    lines = []
-    merge_distance = 1
-    vector_root = ET.fromstring(svg)
-    for obj in vector_root:
-        tag = NAMESPACE_P.match(obj.tag).group("tag")
-        if tag == "path":
-            pen = [0, 0]
-            new_lines = []
-            line = []
-            command = ""
-            previous_command = ""
-            args = []
-            for match in COMMAND_ARGV_P.findall(obj.attrib["d"]):
-                if command == "":
-                    command = match[0]
-                else:
-                    args.append(float(match[1]))
-                if COMMAND_ARGC_P[command.upper()] == len(args) and command != "":
-                    if previous_command in ("M", "m") and command not in ("M", "m"):
-                        line.append(pen)
-
-                    if command == "M":
-                        if len(line) != 0:
-                            new_lines.append(line)
-                            line = []
-                        pen = args
-                    elif command == "m":
-                        if len(line) != 0:
-                            new_lines.append(line)
-                            line = []
-                        pen = [pen[0] + args[0], pen[1] + args[1]]
-
-                    elif command == "L":
-                        pen = args
-                        line.append(pen)
-                    elif command == "l":
-                        pen = [pen[0] + args[0], pen[1] + args[1]]
-                        line.append(pen)
-
-                    elif command == "H":
-                        pen[0] = args[0]
-                        line.append(pen)
-                    elif command == "h":
-                        pen[0] += args[0]
-                        line.append(pen)
-
-                    elif command == "V":
-                        pen[1] = args[1]
-                        line.append(pen)
-                    elif command == "v":
-                        pen[1] += args[1]
-                        line.append(pen)
-
-                    elif command in ("Z", "z"):
-                        line.append(line[0])
-                    else:
-                        pass
-                    # reset
-                    previous_command = command
-                    command = ""
-                    args = []
-            new_lines.append(line)
-
-            # in rare case of line start being at (0, 0) there's no transform attribute
-            if "transform" in obj.attrib:
-                transform = obj.attrib["transform"]
-                numbers = FLOAT_P.findall(transform)
-                numbers = list(map(float, numbers))
-
-                # krita does either translation or matrix
-                # no skews, rotations or others
-                if len(numbers) == 2:  # translation
-                    for i, line in enumerate(new_lines):
-                        for j, point in enumerate(line):
-                            line[j] = [point[0] + numbers[0], point[1] + numbers[1]]
-                        new_lines[i] = line
-                elif len(numbers) == 6:  # matrix
-                    for i, line in enumerate(new_lines):
-                        for j, point in enumerate(line):
-                            line[j] = [
-                                numbers[0] * point[0]
-                                + numbers[2] * point[1]
-                                + numbers[4],
-                                numbers[1] * point[0]
-                                + numbers[3] * point[1]
-                                + numbers[5],
-                            ]
-                        new_lines[i] = line
-
-            # throw out of bounds, merge, round, flatten
-            for line in new_lines:
-                previous_point = []
-                flattened_line = []
-                for point in line:
-                    point = list(map(round, point))
-                    # out of bounds
-                    if point[0] > 800 or point[0] < 0 or point[1] > 600 or point[1] < 0:
-                        i += 1
-                        continue
-                    if not previous_point:
-                        flattened_line += [
-                            ENCODER[point[0]],
-                            ENCODER[point[1]],
-                        ]
-                    else:
-                        if (  # skip if smaller than merge distance
-                            abs(previous_point[0] - point[0]) >= merge_distance
-                            or abs(previous_point[1] - point[1]) >= merge_distance
-                        ):
-                            flattened_line += [
-                                ENCODER[point[0]],
-                                ENCODER[point[1]],
-                            ]
-                    previous_point = point
-                lines.append("".join(flattened_line))
-        else:
-            continue
-    return " ".join(lines)
+    lines = clip_lines(parse_paths(svg))
+    # stay in ascii-safe bytes until the single join, decode once here
+    return b" ".join(map(encode_points, lines)).decode("ascii")
+
+
+VECTOR_LAYER_TYPE = "vectorlayer"
+last_export = (None, "")
 
 
 def document_to_data():
     """Exports vector data from all document's layers to sketch data and returns it as string."""
 
+    global last_export  # pylint: disable=global-statement
+
     document = get_document()
     if document is None:
         return ""
 
-    layers = document.rootNode().childNodes()
-    data = ""
-    for layer in layers:
-        if layer.visible() and str(layer.type()) == "vectorlayer":
-            data += svg_to_data(layer.toSvg())
+    layer_svgs = []
+    for layer in document.rootNode().childNodes():
+        if not layer.visible() or str(layer.type()) != VECTOR_LAYER_TYPE:
+            continue
+        if not layer.shapes():  # saves a toSvg() round trip on empty layers
+            continue
+        layer_svgs.append(layer.toSvg())
+
+    # krita exposes no per-layer modification counter, so key the cache on
+    # the serialized layers; repeated button presses skip the re-encoding
+    key = tuple(map(hash, layer_svgs))
+    if key == last_export[0]:
+        return last_export[1]
+
+    data = " ".join(filter(None, map(svg_to_data, layer_svgs)))
 
     if len(data) == 0:
         show_error("You don't have any vector layers or vector layers are empty!")
+        return data
 
+    last_export = (key, data)
     return data
 
 
+# squared-radians form of the experimentally-determined 230 degree-ish
+# threshold: degrees(sqrt(turn)) * dist > 230 <=> turn * dist**2 > this
+THRESHOLD_SQ = np.radians(230.0) ** 2
+
+
+def keep_indices(points):
+    """Picks the sharp-enough interior points of one decoded line.
+
+    Single O(N) pass over precomputed segment arrays; returns indices
+    into points, endpoints excluded.
+    """
+
+    deltas = np.diff(points, axis=0).astype(np.float64)
+    segments = np.hypot(deltas[:, 0], deltas[:, 1])
+    # turning angle from the cross/dot identity: one arctan2 over the whole
+    # array and, unlike differencing headings, free of the 2*pi branch cut
+    cross = deltas[:-1, 0] * deltas[1:, 1] - deltas[:-1, 1] * deltas[1:, 0]
+    dot = deltas[:-1, 0] * deltas[1:, 0] + deltas[:-1, 1] * deltas[1:, 1]
+    turns = np.arctan2(np.abs(cross), dot)
+    ddist = segments[:-1] + segments[1:]
+    return np.flatnonzero(turns * ddist * ddist > THRESHOLD_SQ) + 1
+
+
+if njit is not None:
+    # the same decision loop at C speed, with no intermediate arrays
+
+    @njit(cache=True)
+    def keep_indices(points):  # pylint: disable=function-redefined
+        kept = np.empty(points.shape[0] - 2, dtype=np.int64)
+        count = 0
+        ux = float(points[1, 0] - points[0, 0])
+        uy = float(points[1, 1] - points[0, 1])
+        ulen = hypot(ux, uy)
+        for i in range(1, points.shape[0] - 1):
+            vx = float(points[i + 1, 0] - points[i, 0])
+            vy = float(points[i + 1, 1] - points[i, 1])
+            vlen = hypot(vx, vy)
+            turn = atan2(abs(ux * vy - uy * vx), ux * vx + uy * vy)
+            ddist = ulen + vlen
+            if turn * ddist * ddist > THRESHOLD_SQ:
+                kept[count] = i
+                count += 1
+            ux, uy, ulen = vx, vy, vlen
+        return kept[:count]
+
+
+def optimize_lines(lines):
+    """Array-level optimizer, drops soft interior points from each line.
+
+    Unchanged lines are passed through as the same array object, so
+    callers can detect no-ops with an identity check.
+    """
+
+    new_lines = []
+    for points in lines:
+        if len(points) <= 3:
+            new_lines.append(points)
+            continue
+        # keep both endpoints plus interior points that turn sharply enough
+        keep = keep_indices(points)
+        if len(keep) == len(points) - 2:  # every point survived
+            new_lines.append(points)
+            continue
+        new_lines.append(points[np.concatenate(([0], keep, [len(points) - 1]))])
+    return new_lines
+
+
 # home-made shitty optimization
-@cache
+@lru_cache(maxsize=32)
 def optimize(data):
+    base36_lines = data.split()
+    decoded = list(map(decode_line, base36_lines))
     new_data = []
-    for base36_line in data.split():
-        points = SPLITTER_P.findall(base36_line)
-        points_len = len(points)
-        if points_len == 2:
+    for base36_line, points in zip(base36_lines, optimize_lines(decoded)):
+        if len(points) * 4 == len(base36_line):  # no-op, reuse the string
             new_data.append(base36_line)
-            continue
-        start = 0
-        end = start + 2
-        new_line = points[0]  # pre-adding
-        while start + 1 < points_len:
-            point_0_str = points[start]
-            point_0 = (DECODER[point_0_str[0:2]], DECODER[point_0_str[2:4]])
-
-            while end < points_len:
-                point_1_str = points[end - 1]
-                point_1 = (DECODER[point_1_str[0:2]], DECODER[point_1_str[2:4]])
-
-                point_2_str = points[end]
-                point_2 = (DECODER[point_2_str[0:2]], DECODER[point_2_str[2:4]])
-
-                ddeg = degrees(
-                    abs(
-                        atan2(-point_2[1] + point_1[1], point_2[0] - point_1[0])
-                        - atan2(-point_1[1] + point_0[1], point_1[0] - point_0[0])
-                    )
-                    ** 0.5
-                )
-                ddist = dist(point_0, point_1) + dist(point_1, point_2)
-                val = ddeg * ddist
-                if val > 230:  # this threshold was determined experimentally
-                    new_line += point_1_str
-                    break  # go to next starting point
-                end += 1
-            start = end - 1
-            end = start + 2
-        new_line += points[-1]  # post-adding
-        new_data.append(new_line)
+        else:
+            new_data.append(encode_points(points).decode("ascii"))
     return " ".join(new_data)
 
 
 CLIPBOARD = krita.QtGui.QGuiApplication.clipboard()
+last_written_hash = None
 
 
 def read_clipboard():
@@ -335,25 +627,53 @@ def read_clipboard():
 
 
 def write_clipboard(text):
-    """Writes text to clipboard."""
-    if len(text) != 0:
-        CLIPBOARD.setText(text)
+    """Writes text to clipboard, skipping the copy if it's already there."""
+
+    global last_written_hash  # pylint: disable=global-statement
+
+    if len(text) == 0:
+        return
+    text_hash = hash(text)
+    if text_hash == last_written_hash and CLIPBOARD.ownsClipboard():
+        return  # the clipboard still holds exactly this text
+    CLIPBOARD.setText(text)
+    last_written_hash = text_hash
 
 
 ESCAPED_NAME = NAME.replace(" ", "-")
-request = Request(
-    "https://garyc.me/sketch/swap.php?v=32",
-    headers={
-        "Accept": "text/plain",
-        "Origin": f"https://{ESCAPED_NAME}",
-        "User-Agent": f"{ESCAPED_NAME}/{VERSION} (+https://github.com/Diamondtroller)",
-        "Sec-Fetch-Dest": "empty",
-        "Sec-Fetch-Mode": "cors",
-        "Sec-Fetch-Site": "cross-site",
-        "Host": "garyc.me",
-    },
-    method="POST",
-)
+SWAP_HOST = "garyc.me"
+SWAP_URL = "/sketch/swap.php?v=32"
+HEADERS = {
+    "Accept": "text/plain",
+    "Origin": f"https://{ESCAPED_NAME}",
+    "User-Agent": f"{ESCAPED_NAME}/{VERSION} (+https://github.com/Diamondtroller)",
+    "Sec-Fetch-Dest": "empty",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "cross-site",
+    "Host": SWAP_HOST,
+    "Connection": "keep-alive",
+}
+SWAP_TIMEOUT = 10  # seconds
+connection = HTTPSConnection(SWAP_HOST, timeout=SWAP_TIMEOUT)
+
+
+def swap_request(body):
+    """POSTs body to the swap endpoint, reusing the kept-alive connection."""
+
+    global connection  # pylint: disable=global-statement
+
+    try:
+        connection.request("POST", SWAP_URL, body=body, headers=HEADERS)
+        return connection.getresponse().read()
+    except (BadStatusLine, ConnectionResetError):
+        # the server dropped the idle keep-alive socket before reading the
+        # request, so it was never processed and is safe to re-send; other
+        # errors (e.g. a timeout after the sketch may have been accepted)
+        # must propagate rather than double-post
+        connection.close()
+        connection = HTTPSConnection(SWAP_HOST, timeout=SWAP_TIMEOUT)
+        connection.request("POST", SWAP_URL, body=body, headers=HEADERS)
+        return connection.getresponse().read()
 
 
 def post_data(data):
@@ -368,9 +688,7 @@ def post_data(data):
         )
         return
 
-    request.data = data.encode("ascii")
-    with urlopen(request) as response:
-        sketch_id = response.read()
+    sketch_id = swap_request(data.encode("ascii"))
 
     if sketch_id == b"":
         show_error("There was an error posting sketch.")
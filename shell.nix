@@ -2,7 +2,9 @@
   with pkgs;
   mkShell {
     buildInputs = [
-      (python39.withPackages (ps: with ps; [pyqt5]))
+      # numpy is a hard runtime dependency; lxml and numba are optional
+      # accelerators the plugin picks up automatically when present
+      (python39.withPackages (ps: with ps; [pyqt5 numpy lxml numba]))
       # Krita 5.1 on many platforms is packaged with Python 3.8.
       # However version 3.8 has a broken packages, so closest working one is used.
       (krita.override{python3Packages = python39Packages;})